@@ -1,6 +1,12 @@
 import argparse
+import functools
 import multiprocessing
+import multiprocessing.connection
+import os
+import selectors
+import signal
 import socket
+import struct
 import time
 import sys
 
@@ -14,8 +20,22 @@ DEFAULT_IP = '10.0.0.2'
 DEFAULT_PORT = 8088
 # The default duration of the data transfer process
 DEFAULT_DURATION = 25
-# The default chunk size of 1000 bytes
-BUFFER_SIZE = 1000
+# The default number of worker processes started by the server, each accepting and serving clients
+DEFAULT_WORKERS = 10
+# The minimum number of seconds a worker must run before it is restarted, a worker failing faster fails again
+MIN_WORKER_UPTIME = 1
+# The default chunk size of 64 KiB, so each send/recv system call moves a large block of data
+BUFFER_SIZE = 65536
+# The number of chunks the client sends per system call
+SEND_BATCH = 16
+# The requested socket send/receive buffer size of 8 MB, so high bandwidth-delay links are not window limited
+SOCKET_BUFFER_SIZE = 8 * 1024 * 1024
+# The number of seconds a single client send call, or the wait for the acknowledgement, may take
+SOCKET_TIMEOUT = 5
+# The supported data size units and their size in bytes
+UNITS = {'B': 1, 'KB': 1000, 'MB': 1000000}
+# The number of megabits in a byte, used to calculate rates with a single multiplication
+MBPS_SCALE = 8 / 1000000
 # The default table format, used for printing results
 TABLE_FORMAT = "{:^15} {:^15} {:^15} {:^15}"
 
@@ -37,21 +57,20 @@ def format_size(size, unit):
     Raises:
         ValueError: If the specified unit is not one of the supported units ('B', 'KB', or 'MB').
     """
-    # Dictionary to store the unit values
-    units = {'B': 1, 'KB': 1000, 'MB': 1000000}
+    unit_size = UNITS.get(unit)
 
-    if unit not in units:
+    if unit_size is None:
         raise ValueError("Invalid unit specified. Supported units are 'B', 'KB', and 'MB'.")
 
-    return size / units[unit]
+    return size / unit_size
 
 
 def calculate_rate(data, elapsed_time):
     """
     Description:
         This function calculates the data transfer rate in megabits per second (Mbps), given the amount
-        of data transferred and the elapsed time. It converts the data to megabits and divides it by the
-        elapsed time to get the rate in Mbps.
+        of data transferred and the elapsed time. It converts the data to megabits with the precomputed
+        MBPS_SCALE factor and divides it by the elapsed time to get the rate in Mbps.
 
     Arguments:
         data (int or float): The amount of data transferred, represented in bytes.
@@ -61,31 +80,31 @@ def calculate_rate(data, elapsed_time):
         float: The data transfer rate in megabits per second (Mbps).
                (Because megabits per second is the desired output.)
     """
-    # Convert from bytes to megabits
-    megabits = (data * 8) / 1000000
-    # Calculate rate as megabits per second (Mbps)
-    rate = megabits / elapsed_time
+    # Convert from bytes to megabits and calculate rate as megabits per second (Mbps)
+    rate = data * MBPS_SCALE / elapsed_time
 
     return rate
 
 
-def print_interval(total_sent, last_interval_sent, interval_start, interval_stop, args):
+def print_interval(endpoint, total_sent, last_interval_sent, interval_start, interval_stop, unit_size, args, rows=None):
     """
     Description:
         This function prints the data transfer information for a given time interval in a table format.
         It calculates the data sent during the interval, formats the data sent to the desired unit,
         calculates the data transfer rate, and prints the information in a formatted table.
+        If a list of rows is given, the row is added to the list instead, to be printed later.
 
     Arguments:
+        endpoint (str): The server IP address and port number, formatted as 'ip:port'.
         total_sent (int): The total amount of data sent up to the current interval, in bytes.
         last_interval_sent (int): The total amount of data sent up to the previous interval, in bytes.
         interval_start (float): The start time of the current interval, in seconds.
         interval_stop (float): The end time of the current interval, in seconds.
+        unit_size (int): The size in bytes of the unit the data sent is displayed in, looked up once by the caller.
         args (Namespace): A namespace object containing the following attributes:
-            - serverip (str): The server IP address.
-            - port (int): The server port number.
             - format (str): The desired unit for displaying the data sent ('B', 'KB', or 'MB').
             - interval (int or float): The time interval for which the data transfer information is printed, in seconds.
+        rows (list or None): A list to add the row to, or None to print the row right away.
 
     Returns:
         None (because the purpose of this function is to print out the statistics of an interval.)
@@ -93,14 +112,22 @@ def print_interval(total_sent, last_interval_sent, interval_start, interval_stop
     # Calculate the amount data sent during this interval
     interval_sent = total_sent - last_interval_sent
     # Format the data to the format specified by the user
-    sent_data = format_size(interval_sent, args.format)
+    sent_data = interval_sent / unit_size
     # Calculate the rate
     rate = calculate_rate(interval_sent, args.interval)
 
-    print(TABLE_FORMAT.format(f"{args.serverip}:{args.port}",
-                              f"{interval_start:.2f} - {interval_stop:.2f}",
-                              f"{sent_data} {args.format}",
-                              f"{rate:.2f} Mbps"))
+    # Format the columns of the row
+    period = f"{interval_start:.2f} - {interval_stop:.2f}"
+    transfer = f"{sent_data} {args.format}"
+    bandwidth = f"{rate:.2f} Mbps"
+
+    # Format the row with a single f-string, laid out like TABLE_FORMAT
+    row = f"{endpoint:^15} {period:^15} {transfer:^15} {bandwidth:^15}"
+
+    if rows is None:
+        print(row)
+    else:
+        rows.append(row)
 
 
 def parse_num_bytes(num_string):
@@ -122,17 +149,16 @@ def parse_num_bytes(num_string):
     if not num_string:
         return None
 
-    # Dictionary to stores the supported units
-    units = {'B': 1, 'KB': 1000, 'MB': 1000000}
     # The number and unit variables of the string input to store the values
-    num, unit = num_string.strip().split()
+    num, _, unit = num_string.strip().partition(' ')
     # Cast the string number value to an integer value.
     num = int(num)
+    unit_size = UNITS.get(unit.strip())
 
-    if unit not in units:
+    if unit_size is None:
         raise ValueError("Invalid unit specified for --num. Supported units are 'B', 'KB', and 'MB'.")
 
-    return num * units[unit]
+    return num * unit_size
 
 
 def print_header(args):
@@ -194,59 +220,124 @@ def print_server_info(args):
     print("------------------------------------------------------------\n")
 
 
-def handle_client(address, connection, args, print_lock):
+def print_socket_buffer(sock, option, name):
     """
     Description:
-        This function handles the data transfer from a connected client. It prints server and client
-        information, receives the data sent by the client, and calculates the total data received,
-        elapsed time, and data transfer rate. It then prints the final result in a table format.
+        This function prints the effective size of a socket buffer, as reported by the kernel. The kernel may
+        limit or adjust the requested size (Linux doubles it and caps it at net.core.rmem_max/wmem_max),
+        so the printed value shows what the measurement is actually running with.
 
     Arguments:
-        address (tuple): A tuple containing the client's IP address and port number.
-        connection (socket): A socket object representing the connection to the client.
+        sock (socket): The socket to read the buffer size from.
+        option (int): The socket option to read, either socket.SO_SNDBUF or socket.SO_RCVBUF.
+        name (str): The name of the buffer to print, e.g. 'send' or 'receive'.
+
+    Returns:
+        None (because the purpose of this function is to print information to the user.)
+    """
+    print(f"Socket {name} buffer: {sock.getsockopt(socket.SOL_SOCKET, option)} bytes\n")
+
+
+def accept_client(server_socket, selector, args):
+    """
+    Description:
+        This function accepts a client connection on a worker's server socket and registers it with the
+        worker's selector, together with a dictionary holding the state of the client's data transfer.
+        It prints server and client information.
+
+    Arguments:
+        server_socket (socket): The worker's listening server socket.
+        selector (BaseSelector): The selector the worker uses to wait for incoming connections and data.
         args (Namespace): A namespace object containing the following attributes:
             - bind (str): The server's bind address.
             - port (int): The server port number.
-            - format (str): The desired unit for displaying the received data ('B', 'KB', or 'MB').
-        print_lock (Lock): A threading.Lock object used to synchronize the print statements among threads.
 
     Returns:
-        None (because this function is called from the server mode to handle incoming clients.)
+        None (because the client is handled by the worker's selector loop from now on.)
     """
+    try:
+        # Accept a client connection
+        connection, address = server_socket.accept()
+    except OSError:
+        # The connection was closed or reset by the client before it could be accepted, this also covers
+        # ConnectionAbortedError, and BlockingIOError if another event already took the connection
+        return
+
+    # The connection is only read when the selector reports data, so it never has to block
+    connection.setblocking(False)
+    # Disable Nagle's algorithm, so the acknowledgement is sent right away
+    connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
     # Print server information
     print_server_info(args)
     # Print client connection information
     print(f"A simpleperf client with {address[0]}:{address[1]} is connected with {args.bind}:{args.port}\n")
 
-    # Initialize start time for data transfer
-    start_time = time.time()
-    # Initialize total_received variable to store the total amount of data received
-    total_received = 0
-    # Receive data from the client
-    data = connection.recv(BUFFER_SIZE)
-
-    # Process the received data
-    while data:
-        # Check if the received data is the 'BYE' message
-        if b'BYE' in data:
+    # The state of the data transfer: the client address, the start time, the total amount of data received,
+    # and the last three bytes received, as the 'BYE' message may be split over two reads
+    state = {'address': address, 'start_time': time.monotonic(), 'total_received': 0, 'tail': b''}
+    selector.register(connection, selectors.EVENT_READ, state)
+
+
+def receive_client_data(connection, state, data, selector, args, print_lock):
+    """
+    Description:
+        This function handles data from a connected client, once the selector reports it can be read.
+        It receives the data and adds it to the total data received. When the client sends the 'BYE'
+        message or closes the connection, it acknowledges, closes the connection, calculates the elapsed
+        time and data transfer rate, and prints the final result in a table format. If the connection
+        fails, e.g. because the client resets it, the error is printed and only this connection is closed.
+
+    Arguments:
+        connection (socket): A socket object representing the connection to the client.
+        state (dict): The state of the client's data transfer, created by accept_client.
+        data (memoryview): The preallocated receive buffer, shared by all clients of the worker.
+        selector (BaseSelector): The selector the worker uses to wait for incoming connections and data.
+        args (Namespace): A namespace object containing the following attributes:
+            - bind (str): The server's bind address.
+            - port (int): The server port number.
+            - format (str): The desired unit for displaying the received data ('B', 'KB', or 'MB').
+        print_lock (Lock): A multiprocessing.Lock object used to synchronize the print statements among processes.
+
+    Returns:
+        None (because this function is called from the worker's selector loop.)
+    """
+    try:
+        # Receive data from the client, recv_into fills the buffer without creating a new bytes object
+        received = connection.recv_into(data)
+
+        if received:
+            # Increment the total_received variable by the number of bytes received
+            state['total_received'] += received
+            # The 'BYE' message is always the last data sent by the client, so only the end of the data is checked
+            if received >= 3:
+                state['tail'] = bytes(data[received - 3:received])
+            else:
+                state['tail'] = (state['tail'] + bytes(data[:received]))[-3:]
+            # Wait for more data, unless the received data is the 'BYE' message
+            if state['tail'] != b'BYE':
+                return
             # Send an acknowledgement and terminate the connection
             connection.sendall(b'ACK: BYE')
-            total_received += len(data) - len(b'BYE')
-            break
-        # Increment the total_received variable by the length of the received data
-        total_received += len(data)
-        # Receive more data from the client
-        data = connection.recv(BUFFER_SIZE)
+            state['total_received'] -= len(b'BYE')
+    except OSError as error:
+        # The client reset or dropped the connection, only this client's transfer ends, the worker
+        # keeps serving its other clients
+        selector.unregister(connection)
+        connection.close()
+        print(f"Error: connection with {state['address'][0]}:{state['address'][1]} failed: {error}")
+        return
 
     # Close the connection to the client
+    selector.unregister(connection)
     connection.close()
 
     # Calculate the elapsed time for the data transfer
-    elapsed_time = time.time() - start_time
+    elapsed_time = time.monotonic() - state['start_time']
     # Format the total_received data using the specified unit
-    received_data = format_size(total_received, args.format)
+    received_data = format_size(state['total_received'], args.format)
     # Calculate the data transfer rate
-    rate = calculate_rate(total_received, elapsed_time)
+    rate = calculate_rate(state['total_received'], elapsed_time)
 
     # Print the final result within the context of the print_lock
     with print_lock:
@@ -255,50 +346,180 @@ def handle_client(address, connection, args, print_lock):
         print("\n")
 
 
-def server_mode(args):
+def create_server_socket(args, reuse_port=True):
     """
     Description:
-        This function sets up and runs a server in server mode. It creates a server socket, binds it to
-        the specified address and port, and listens for incoming client connections. For each client connection,
-        it spawns a new process using multiprocessing to handle the client's data transfer. The server continues
-        running until a KeyboardInterrupt occurs, at which point the server socket is closed.
+        This function creates a server socket and binds it to the specified address and port. SO_REUSEPORT
+        is set, so every worker process can bind its own socket to the same port, and the kernel spreads
+        the incoming client connections over the workers' sockets.
 
     Arguments:
         args (Namespace): A namespace object containing the following attributes:
             - bind (str): The server's bind address.
             - port (int): The server port number.
-            - format (str): The desired unit for displaying the received data ('B', 'KB', or 'MB').
+        reuse_port (bool): If False, SO_REUSEPORT is not set, so the bind fails if the port is already in use.
 
     Returns:
-        None (because this is a function that runs a loop, waiting for incoming clients.)
+        socket: The bound server socket (because the caller decides whether it should listen.)
     """
     # Create a server socket
     server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    # Allow the server to be restarted right away on the same port
+    server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    # Allow the worker processes to bind to the same port, if the platform supports it
+    if reuse_port and hasattr(socket, 'SO_REUSEPORT'):
+        server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    # Enlarge the receive buffer, accepted connections inherit it from the listening socket
+    server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_SIZE)
     # Bind the server socket to the specified address and port
     server_socket.bind((args.bind, args.port))
+
+    return server_socket
+
+
+def accept_loop(args, print_lock):
+    """
+    Description:
+        This function runs in each of the worker processes started by the server. It creates its own server
+        socket on the shared port and waits for incoming connections and client data with a selector (epoll
+        on Linux), so a single worker handles many clients at the same time without a process per client.
+        The worker continues running until a KeyboardInterrupt occurs, at which point its server socket is closed.
+
+    Arguments:
+        args (Namespace): A namespace object containing the following attributes:
+            - bind (str): The server's bind address.
+            - port (int): The server port number.
+            - format (str): The desired unit for displaying the received data ('B', 'KB', or 'MB').
+            - bufsize (int): The number of bytes to read from the socket per recv call.
+        print_lock (Lock): A multiprocessing.Lock object used to synchronize the print statements among processes.
+
+    Returns:
+        None (because this function is run as a worker process of the server.)
+    """
+    # Restore the default SIGTERM handling, a worker restarted by the server inherits the server's handler,
+    # but terminate() must stop every worker the same way
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    server_socket = create_server_socket(args)
     # Set the server socket to listen for incoming connections
     server_socket.listen(5)
+    server_socket.setblocking(False)
+
+    # Create the selector and register the server socket, without a state, to wait for connections
+    selector = selectors.DefaultSelector()
+    selector.register(server_socket, selectors.EVENT_READ)
+    # Preallocate the receive buffer once, the data itself is not used, so all clients share it
+    data = memoryview(bytearray(args.bufsize))
+
+    try:
+        # Continuously handle incoming client connections and data
+        while True:
+            for key, events in selector.select():
+                if key.data is None:
+                    accept_client(server_socket, selector, args)
+                else:
+                    receive_client_data(key.fileobj, key.data, data, selector, args, print_lock)
+    except KeyboardInterrupt:
+        # The server has stopped
+        pass
+    finally:
+        # Close the selector and the server socket of the worker
+        selector.close()
+        server_socket.close()
+
+
+def start_worker(args, print_lock):
+    """
+    Description:
+        This function starts a worker process of the server, which accepts and serves clients in accept_loop.
+
+    Arguments:
+        args (Namespace): A namespace object with the attributes used by accept_loop.
+        print_lock (Lock): A multiprocessing.Lock object used to synchronize the print statements among processes.
+
+    Returns:
+        tuple: The started worker process and the monotonic time it was started at (because the server
+               only restarts a worker that has been running for a while.)
+    """
+    process = multiprocessing.Process(target=accept_loop, args=(args, print_lock), daemon=True)
+    process.start()
+
+    return process, time.monotonic()
+
+
+def server_mode(args):
+    """
+    Description:
+        This function sets up and runs a server in server mode. It starts a number of worker processes, each
+        with its own server socket bound to the same address and port with SO_REUSEPORT, so the kernel
+        spreads the incoming client connections over the workers. Each worker handles the data transfer
+        of all the clients it accepts at the same time, with a selector. The server continues running until
+        a KeyboardInterrupt occurs (or it is terminated), at which point the workers are stopped. A worker
+        that exits on its own is reported and replaced, unless it failed right after it was started, then
+        the server stops with exit code 1.
+
+    Arguments:
+        args (Namespace): A namespace object containing the following attributes:
+            - bind (str): The server's bind address.
+            - port (int): The server port number.
+            - format (str): The desired unit for displaying the received data ('B', 'KB', or 'MB').
+            - workers (int): The number of worker processes accepting clients.
+
+    Returns:
+        None (because this is a function that runs until the server is stopped.)
+    """
+    # Bind a socket once, so an invalid address or a port in use is reported before the workers start.
+    # It does not listen, so the kernel does not hand any client connections to it. SO_REUSEPORT is not
+    # set, otherwise the bind would succeed next to the workers of a server already running on the port.
+    try:
+        server_socket = create_server_socket(args, reuse_port=False)
+    except OSError as error:
+        print(f"Error: could not bind to {args.bind}:{args.port}: {error}")
+        sys.exit(1)
 
     # Print server information
     print_server_info(args)
+    print_socket_buffer(server_socket, socket.SO_RCVBUF, 'receive')
+
+    server_socket.close()
+
+    # Only a single worker can bind to the port if the platform does not support SO_REUSEPORT
+    if not hasattr(socket, 'SO_REUSEPORT'):
+        args.workers = 1
+
     # Create a print_lock to synchronize print statements among processes
     print_lock = multiprocessing.Lock()
 
+    # Start the worker processes
+    workers = [start_worker(args, print_lock) for worker in range(args.workers)]
+
+    # Stop the server the same way on SIGTERM as on a KeyboardInterrupt, so the workers are stopped too.
+    # The workers restore the default SIGTERM handling in accept_loop.
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+
     try:
-        # Continuously accept incoming client connections
+        # Wait for the worker processes, a worker only exits on its own if it has failed
         while True:
-            # Accept a client connection
-            connection, address = server_socket.accept()
-            # Create a new process to handle the client's data transfer
-            client_process = multiprocessing.Process(target=handle_client, args=(address, connection, args, print_lock))
-            # Start the client_process
-            client_process.start()
+            multiprocessing.connection.wait([process.sentinel for process, started in workers])
+
+            for index, (process, started) in enumerate(workers):
+                if process.is_alive():
+                    continue
+
+                print(f"Error: worker process {process.pid} exited with code {process.exitcode}.")
+                # A worker failing right after it was started would keep failing, so stop the server
+                if time.monotonic() - started < MIN_WORKER_UPTIME:
+                    print("Error: the worker failed right after it was started, stopping server.")
+                    sys.exit(1)
+                # Replace the worker, so the server keeps serving clients on all of its workers
+                workers[index] = start_worker(args, print_lock)
     except KeyboardInterrupt:
         # Handle the KeyboardInterrupt to stop the server
         print("Keyboard interrupt: Stopping server.")
     finally:
-        # Close the server socket
-        server_socket.close()
+        # Stop the workers that are still running
+        for process, started in workers:
+            process.terminate()
 
 
 def print_client(args):
@@ -345,6 +566,121 @@ def print_client_connection(args, client_ip, client_port):
         print(f"Client connected with {args.serverip} port {args.port}\n")
 
 
+def create_payload_file(data):
+    """
+    Description:
+        This function creates an anonymous in-memory file (memfd) holding the data the client sends, so the
+        data can be passed to the socket with sendfile(2). The kernel then copies the data straight from the
+        file to the socket, without copying it from user space on every send call.
+
+    Arguments:
+        data (bytes): The data to store in the in-memory file.
+
+    Returns:
+        file or None: A binary file object positioned at the start of the data, or None if the platform
+                      does not support in-memory files (because the caller then falls back to sendall).
+    """
+    if not hasattr(os, 'memfd_create'):
+        return None
+
+    # Create the in-memory file and fill it with the data to send
+    payload_file = open(os.memfd_create('simpleperf'), 'w+b')
+    payload_file.write(data)
+    payload_file.flush()
+    payload_file.seek(0)
+
+    return payload_file
+
+
+def send_buffers(sock, buffers):
+    """
+    Description:
+        This function sends a list of buffers to a socket with sendmsg, so several chunks are sent with a
+        single system call (scatter/gather). If the socket only accepts part of the data, the buffers that
+        were already sent are skipped and the rest is sent with the next call. On platforms without sendmsg
+        (e.g. Windows) the buffers are joined and sent with sendall.
+
+    Arguments:
+        sock (socket): The socket to send the data to.
+        buffers (list): A list of bytes-like objects (e.g. memoryview slices of the data) to send in order.
+
+    Returns:
+        int: The total number of bytes sent (because the caller keeps track of the amount of data sent.)
+    """
+    # sendmsg is not available on every platform, sendall then sends the joined buffers
+    if not hasattr(socket.socket, 'sendmsg'):
+        data = b''.join(buffers)
+        sock.sendall(data)
+        return len(data)
+
+    total_sent = 0
+
+    while buffers:
+        sent = sock.sendmsg(buffers)
+        total_sent += sent
+        # Skip the buffers that were sent completely
+        index = 0
+        while index < len(buffers) and sent >= len(buffers[index]):
+            sent -= len(buffers[index])
+            index += 1
+        buffers = buffers[index:]
+        # Skip the part of a buffer that was only sent partially
+        if sent:
+            buffers[0] = buffers[0][sent:]
+
+    return total_sent
+
+
+def send_timed(send_batch, stop_time):
+    """
+    Description:
+        This function sends batches of data until the stop time is reached. It is the send loop used when
+        the client sends data for a specified amount of time, so it does not keep track of remaining bytes.
+
+    Arguments:
+        send_batch (callable): A function without arguments that sends one batch of data and returns the
+                               number of bytes sent.
+        stop_time (float): The monotonic time at which to stop sending, in seconds.
+
+    Returns:
+        int: The number of bytes sent (because the caller keeps track of the amount of data sent.)
+    """
+    monotonic = time.monotonic
+    total_sent = 0
+
+    while monotonic() < stop_time:
+        total_sent += send_batch()
+
+    return total_sent
+
+
+def send_num(send_batch, stop_time, remaining_bytes, batch_size):
+    """
+    Description:
+        This function sends full batches of data until fewer than batch_size bytes remain, or the stop time
+        is reached. It is the send loop used when the client sends a specified number of bytes.
+
+    Arguments:
+        send_batch (callable): A function without arguments that sends one batch of data and returns the
+                               number of bytes sent.
+        stop_time (float): The monotonic time at which to stop sending, in seconds.
+        remaining_bytes (int): The number of bytes left to send.
+        batch_size (int): The number of bytes sent with a single call to send_batch.
+
+    Returns:
+        int: The number of bytes sent (because the caller keeps track of the amount of data sent.)
+    """
+    monotonic = time.monotonic
+    total_sent = 0
+
+    while remaining_bytes >= batch_size and monotonic() < stop_time:
+        sent = send_batch()
+        total_sent += sent
+        remaining_bytes -= sent
+
+    return total_sent
+
+
 def create_parallel_connections(args):
     """
     Description:
@@ -362,17 +698,15 @@ def create_parallel_connections(args):
     Returns:
         None (because this function is called from client mode to create connections.)
     """
-    # Create a Manager object to manage shared resources across processes
-    manager = multiprocessing.Manager()
-    # Create a shared list to store the results from each process
-    results_list = manager.list()
+    # Create a queue the processes put their results in
+    results_queue = multiprocessing.Queue()
 
     # Initialize an empty list to store the created processes
     processes = []
 
     # Create a process for each parallel connection
     for conn in range(args.parallel):
-        process = multiprocessing.Process(target=client_connection, args=(args, results_list))
+        process = multiprocessing.Process(target=client_connection, args=(args, results_queue))
         process.start()
         processes.append(process)
 
@@ -383,18 +717,23 @@ def create_parallel_connections(args):
     if args.parallel > 1:
         print("\n")
 
-    # Print the header and the results after all processes have completed
+    # Collect the results after all processes have completed
+    results = []
+    while not results_queue.empty():
+        results.append(results_queue.get())
+
+    # Print the header and the results
     print_header(args)
-    for result in results_list:
+    for result in results:
         print_final_result(*result, args)
 
 
-def client_connection(args, results_list):
+def client_connection(args, results_queue):
     """
     Description:
         This function establishes a connection to the server and sends data for a specified amount of time,
         or until a specified number of bytes have been sent. It also prints the client connection information,
-        sends data in intervals, and appends the final results to the shared results_list.
+        sends data in intervals, and puts the final results in the shared results_queue.
 
     Arguments:
         args (Namespace): A namespace object containing the following attributes:
@@ -405,35 +744,58 @@ def client_connection(args, results_list):
             - num (str): The total amount of data to send, specified with a unit ('B', 'KB', or 'MB').
             - format (str): The desired unit for displaying the received data ('B', 'KB', or 'MB').
             - parallel (int): The number of parallel clients.
-        results_list (List): A shared list managed by the Manager object to store the results from each process.
+            - bufsize (int): The size of each chunk of data, SEND_BATCH chunks are sent per send call.
+            - buffered_report (bool): If True, the interval rows are printed once the data has been sent.
+        results_queue (Queue): A multiprocessing.Queue object to pass the results from each process to the parent.
 
     Returns:
         None (because this functions establishes a connection to a server.)
 
     Raises:
         socket.timeout: Raised if there is a timeout while waiting for an acknowledgement from the server.
+        BlockingIOError or socket.timeout: Raised by a send call that cannot queue any data for SOCKET_TIMEOUT
+                                           seconds. The limit is per call, not for the whole transfer.
     """
     # Create a client socket
     client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    # Enlarge the send buffer, so the sender is not stalled waiting for the window to grow
+    client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER_SIZE)
+    # Disable Nagle's algorithm, the data is already sent in large chunks
+    client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
     # Connect the client socket to server specified by user
     client_socket.connect((args.serverip, args.port))
-    # Set a timeout for the client socket
-    client_socket.settimeout(5)
 
     # Initialize the current time as start time
-    start_time = time.time()
+    start_time = time.monotonic()
     # Initialize total data sent in number of bytes
     total_sent = 0
     # Initialize the data sent during the last interval
     last_interval_sent = 0
-    # Creating a bytes object to store data sent from the client
-    data_to_send = b'0' * BUFFER_SIZE
+    # Creating a bytes object to store data sent from the client, allocated once for the whole transfer
+    data_to_send = b'0' * args.bufsize
+    # Creating a view of the data, it is never changed, so every batch is built from the full chunk
+    data_view = memoryview(data_to_send)
+    # Creating the list of chunks sent with a single call, all pointing to the same data
+    data_buffers = [data_view] * SEND_BATCH
+    # The number of bytes sent with a single call
+    batch_size = args.bufsize * SEND_BATCH
+    # Creating an in-memory file with a batch of data, used to send it with sendfile
+    payload_file = create_payload_file(data_to_send * SEND_BATCH)
+    # The file descriptors passed to sendfile, the socket stays blocking while data is sent
+    socket_fd = client_socket.fileno()
+    payload_fd = payload_file.fileno() if payload_file else None
     # Initialize the interval start variable
     interval_start = 0
     # Initialize the interval stop variable
     interval_stop = args.interval
+    # The monotonic time at which the current interval ends
+    interval_deadline = start_time + args.interval
+    # The monotonic time at which the data transfer ends
+    deadline = start_time + args.time
     # Initialize the remaining bytes to send
     remaining_bytes = 0
+    # Initialize the final partial batch of data, sent together with the 'BYE' message
+    tail_buffers = []
     # The minimum duration, helps the script make time to calculate if the amount of data is very low
     min_duration = 0.1
 
@@ -442,42 +804,96 @@ def client_connection(args, results_list):
 
     # Print the client connection information
     print_client_connection(args, client_ip, client_port)
+    print_socket_buffer(client_socket, socket.SO_SNDBUF, 'send')
+
+    # The server address printed in every interval row
+    endpoint = f"{args.serverip}:{args.port}"
+    # The size in bytes of the unit the data sent is displayed in
+    unit_size = UNITS[args.format]
+    # The list of interval rows printed once the data has been sent, or None to print each row right away
+    report_rows = [] if args.buffered_report else None
+
+    # Bind the options used in the send loop to local variables, so the loop does not
+    # look up attributes on every iteration (args is only used for reporting)
+    interval = args.interval
+    use_num = bool(args.num)
+    monotonic = time.monotonic
 
     # Parse the total number of bytes to send, if specified
-    if args.num:
+    if use_num:
         remaining_bytes = parse_num_bytes(args.num)
 
-    # Send data to the server, while tracking intervals and remaining bytes
-    while True:
-        elapsed_time = time.time() - start_time
+    # Choose how a batch is sent once, instead of on every iteration
+    if payload_file:
+        # sendfile needs a blocking socket, so a send call that cannot queue any data for SOCKET_TIMEOUT seconds
+        # is failed by the kernel instead. memfd is Unix-only, where the timeout is a timeval of two longs.
+        client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDTIMEO, struct.pack('ll', SOCKET_TIMEOUT, 0))
+        # Let the kernel copy the data from the payload file straight to the socket, with a single call
+        send_batch = functools.partial(os.sendfile, socket_fd, payload_fd, 0, batch_size)
+    else:
+        # Fail a send call that takes longer than SOCKET_TIMEOUT seconds, this works on every platform
+        client_socket.settimeout(SOCKET_TIMEOUT)
+        send_batch = functools.partial(send_buffers, client_socket, data_buffers)
+
+    # Send data to the server one interval at a time, the specialized send loops only check the stop time
+    try:
+        while True:
+            stop_time = min(interval_deadline, deadline) if interval > 0 else deadline
+
+            if use_num:
+                sent = send_num(send_batch, stop_time, remaining_bytes, batch_size)
+                remaining_bytes -= sent
+            else:
+                sent = send_timed(send_batch, stop_time)
+            total_sent += sent
 
-        if (args.interval > 0) & (elapsed_time >= interval_stop):
-            print_interval(total_sent, last_interval_sent, interval_start, interval_stop, args)
-            last_interval_sent = total_sent
-            interval_start = interval_stop
-            interval_stop += args.interval
+            now = monotonic()
 
-        if elapsed_time >= args.time:
-            break
+            if interval > 0 and now >= interval_deadline:
+                print_interval(endpoint, total_sent, last_interval_sent, interval_start, interval_stop, unit_size, args, report_rows)
+                last_interval_sent = total_sent
+                interval_start = interval_stop
+                interval_stop += interval
+                interval_deadline += interval
 
-        if args.num:
-            if remaining_bytes <= 0:
+            if now >= deadline or (use_num and remaining_bytes < batch_size):
                 break
-            data_to_send = data_to_send[:remaining_bytes]
-            remaining_bytes -= len(data_to_send)
+    except (BlockingIOError, socket.timeout):
+        # The send timeout expired, a single send call could not queue any data for SOCKET_TIMEOUT seconds.
+        # The limit is per call, a server reading a little now and then delays the timeout.
+        print("Error: Timeout while sending data to server.")
+        if payload_file:
+            payload_file.close()
+        client_socket.close()
+        return
+
+    # The final partial batch is not sent in the loop, but together with the 'BYE' message
+    if use_num and remaining_bytes < batch_size:
+        full_chunks, last_chunk = divmod(remaining_bytes, args.bufsize)
+        tail_buffers = [data_view] * full_chunks + [data_view[:last_chunk]]
 
-        client_socket.sendall(data_to_send)
-        total_sent += len(data_to_send)
+    # Close the payload file, the data has been sent
+    if payload_file:
+        payload_file.close()
+
+    # Print the buffered interval rows with a single write
+    if report_rows:
+        sys.stdout.write("\n".join(report_rows) + "\n")
+        sys.stdout.flush()
 
     # Initialize the remaining duration
-    remaining_duration = min_duration - elapsed_time
+    remaining_duration = min_duration - (now - start_time)
 
     # Wait for the remaining duration, if any
     if remaining_duration > 0:
         time.sleep(remaining_duration)
 
-    # Send a BYE message to the server
-    client_socket.sendall(b'BYE')
+    # Set a timeout for the client socket, used while waiting for the acknowledgement
+    client_socket.settimeout(SOCKET_TIMEOUT)
+
+    # Send the final partial batch and a BYE message to the server with a single call, so the
+    # short 'BYE' message does not go out as a separate tiny segment
+    total_sent += send_buffers(client_socket, tail_buffers + [b'BYE']) - len(b'BYE')
 
     # Receive the acknowledgement from the server
     try:
@@ -492,11 +908,11 @@ def client_connection(args, results_list):
 
     # Process the final results
     if acknowledgement == b'ACK: BYE':
-        elapsed_time = time.time() - start_time
-        sent_data = format_size(total_sent, args.format)
+        elapsed_time = time.monotonic() - start_time
+        sent_data = total_sent / unit_size
         rate = calculate_rate(total_sent, elapsed_time)
 
-        results_list.append((args.serverip, args.port, elapsed_time, sent_data, rate))
+        results_queue.put((args.serverip, args.port, elapsed_time, sent_data, rate))
     else:
         print("Error: Invalid acknowledgement message received from server.")
 
@@ -560,6 +976,12 @@ def main():
                         help='creates parallel connections to connect to the server and send data - it must be 1 and the max value should be 5 - default:1')
     parser.add_argument('-n', '--num', type=str, default='',
                         help='transfer number of bytes specified by -n flag, it should be either in B, KB or MB. e.g "20000 B", "3000 KB", "200 MB"')
+    parser.add_argument('--buffered-report', action='store_true',
+                        help='collect the interval statistics and print them once the data has been sent, so printing does not slow down the client')
+    parser.add_argument('-w', '--workers', type=int, default=DEFAULT_WORKERS,
+                        help='the number of worker processes started in server mode, each accepting clients on the same port - it must be > 0 - default:10')
+    parser.add_argument('--bufsize', type=int, default=BUFFER_SIZE,
+                        help='the number of bytes moved per recv call and the chunk size of the client, which sends 16 chunks per call - it must be > 0 - default:65536')
 
     args = parser.parse_args()
 
@@ -568,6 +990,16 @@ def main():
         print('Error: you must run either in server or client mode')
         sys.exit(1)
 
+    # Checking if the number of workers is greater than 0, if not, exit.
+    if args.workers <= 0:
+        print('Error: the -w (workers) value must be greater than 0.')
+        sys.exit(1)
+
+    # Checking if the buffer size is greater than 0, if not, exit.
+    if args.bufsize <= 0:
+        print('Error: the --bufsize value must be greater than 0.')
+        sys.exit(1)
+
     # Running server or client mode depending on the arguments
     if args.server:
         server_mode(args)